@@ -1,21 +1,25 @@
 """Create sample datasets for testing the pipeline."""
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.models.train import load_data
+
 # Set random seed for reproducibility
-np.random.seed(42)
+rng = np.random.default_rng(42)
 
-# Create sample data
+# Create sample data in a single float32 allocation
 n_samples = 1000
-data = {
-    'feature1': np.random.randn(n_samples),
-    'feature2': np.random.randn(n_samples),
-    'feature3': np.random.randn(n_samples),
-    'target': np.random.randint(0, 2, n_samples)
-}
+feature_names = ['feature1', 'feature2', 'feature3']
+X = rng.standard_normal((n_samples, len(feature_names)), dtype=np.float32)
+y = rng.integers(0, 2, size=n_samples, dtype=np.int8)
 
-df = pd.DataFrame(data)
+df = pd.DataFrame(X, columns=feature_names)
+df['target'] = y
 
 # Create directories
 Path('data/processed').mkdir(parents=True, exist_ok=True)
@@ -28,8 +32,13 @@ test_df = df.drop(train_df.index)
 train_df.to_csv('data/processed/train.csv', index=False)
 test_df.to_csv('data/processed/test.csv', index=False)
 
+# Prime load_data's Parquet cache from the CSVs so cached and freshly
+# parsed reads see the same dtypes
+load_data('data/processed/train.csv')
+load_data('data/processed/test.csv')
+
 print(f"✅ Created sample datasets:")
 print(f"   Training: {len(train_df)} samples")
 print(f"   Test: {len(test_df)} samples")
-print(f"   Features: {list(data.keys())[:-1]}")
-print(f"   Target: {list(data.keys())[-1]}")
+print(f"   Features: {feature_names}")
+print(f"   Target: target")
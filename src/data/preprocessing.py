@@ -1,5 +1,6 @@
+import pandas as pd
+
 def load_data(file_path):
-    import pandas as pd
     return pd.read_csv(file_path)
 
 def clean_data(df):
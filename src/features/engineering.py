@@ -1,19 +1,71 @@
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+def _fuse_numpy(f1, f2, out):
+    np.multiply(f1, f2, out=out)
+
+def _scale_columns_numpy(x, cols, mean, scale):
+    x[:, cols] = (x[:, cols] - mean) / scale
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _fuse(f1, f2, out):
+        # Compiled elementwise kernel; add further engineered columns here
+        for i in prange(f1.size):
+            out[i] = f1[i] * f2[i]
+
+    @njit(cache=True)
+    def scale_columns(x, cols, mean, scale):
+        # Standardize the given columns of x in place, as StandardScaler.transform
+        for i in range(x.shape[0]):
+            for j in range(cols.size):
+                c = cols[j]
+                x[i, c] = (x[i, c] - mean[j]) / scale[j]
+else:
+    _fuse = _fuse_numpy
+    scale_columns = _scale_columns_numpy
+
 def create_features(df):
     # Example feature engineering: creating a new feature based on existing ones
-    df['new_feature'] = df['feature1'] * df['feature2']  # Replace with actual feature logic
+    out = np.empty(len(df), dtype=np.float32)
+    _fuse(df['feature1'].to_numpy(np.float32, copy=False),
+          df['feature2'].to_numpy(np.float32, copy=False), out)
+    df['new_feature'] = out  # Replace with actual feature logic
     return df
 
 def encode_categorical_features(df, categorical_cols):
     # Example encoding of categorical features
     for col in categorical_cols:
-        df[col] = df[col].astype('category').cat.codes
+        codes, uniques = pd.factorize(df[col], sort=True)
+        df[col] = codes.astype(np.int16 if len(uniques) < 2**15 else np.int32, copy=False)
     return df
 
-def scale_features(df, numeric_cols):
-    # Example feature scaling
-    from sklearn.preprocessing import StandardScaler
-    scaler = StandardScaler()
-    df[numeric_cols] = scaler.fit_transform(df[numeric_cols])
+def fit_scaler(df, numeric_cols, scaler=None):
+    # Accumulate scaling statistics; for chunked data call this on every chunk
+    # before transforming any of them
+    if scaler is None:
+        scaler = StandardScaler(copy=False)
+    scaler.partial_fit(df[numeric_cols].to_numpy(dtype=np.float32))
+    return scaler
+
+def scale_features(df, numeric_cols, scaler=None, scaler_path=None):
+    # Example feature scaling; pass a scaler from fit_scaler to reuse its statistics
+    if scaler is None:
+        scaler = fit_scaler(df, numeric_cols)
+    df[numeric_cols] = scaler.transform(df[numeric_cols].to_numpy(dtype=np.float32))
+    if scaler_path:
+        # Keep the column order so the predictor can apply the same transform
+        Path(scaler_path).parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump({'scaler': scaler, 'columns': list(numeric_cols)}, scaler_path)
     return df
 
 def feature_engineering_pipeline(df):
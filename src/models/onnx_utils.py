@@ -0,0 +1,31 @@
+"""ONNX conversion helpers for fitted sklearn models."""
+from typing import Optional
+import logging
+
+import numpy as np
+
+try:
+    from skl2onnx import to_onnx
+except ImportError:
+    to_onnx = None
+
+logger = logging.getLogger(__name__)
+
+
+def convert_to_onnx(model, n_features: int) -> Optional[bytes]:
+    """Serialize a fitted sklearn classifier to ONNX, or return None if unsupported."""
+    if to_onnx is None:
+        return None
+    
+    sample = np.zeros((1, n_features), dtype=np.float32)
+    try:
+        onx = to_onnx(model, sample, options={type(model): {"zipmap": False}})
+    except Exception as e:
+        # Converter errors can embed whole node definitions; keep the log short
+        reason = str(e).splitlines()[0][:120] if str(e) else ""
+        logger.warning(
+            f"ONNX conversion unavailable for {type(model).__name__} "
+            f"({type(e).__name__}: {reason})"
+        )
+        return None
+    return onx.SerializeToString()
@@ -1,13 +1,27 @@
 """Model prediction module with MLflow integration."""
 import os
+import asyncio
+import warnings
+from collections import OrderedDict
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, Any, Optional
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from typing import Dict, Any, List, Optional
 import logging
 
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+from src.features.engineering import scale_columns
+from src.models.onnx_utils import convert_to_onnx
+
 logger = logging.getLogger(__name__)
 
+# Number of loaded model versions kept in memory for fast switching
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "2"))
+
 
 class ModelPredictor:
     """Model predictor with MLflow integration."""
@@ -19,6 +33,93 @@ class ModelPredictor:
         self.current_version = None
         self.current_run_id = None
         self.model_metadata = None
+        self.scaler = None
+        self.scaler_idx = None
+        self.feature_order = None
+        self.onnx_session = None
+        self._model_cache = OrderedDict()
+        self._load_locks = {}
+        # Always keep at least the current model cached
+        self.cache_size = max(1, MODEL_CACHE_SIZE)
+    
+    def _compile_model(self, model):
+        """Build an ONNX Runtime session for a model when possible."""
+        if ort is None or os.getenv("USE_ONNX_RUNTIME", "1") != "1":
+            return None
+        if not hasattr(model, "n_features_in_"):
+            return None
+        # skl2onnx cannot convert HistGradientBoosting models; don't retry on every load
+        if isinstance(model, HistGradientBoostingClassifier):
+            return None
+        
+        onx = convert_to_onnx(model, model.n_features_in_)
+        if onx is None:
+            return None
+        logger.info("Serving predictions through ONNX Runtime")
+        return ort.InferenceSession(onx, providers=["CPUExecutionProvider"])
+    
+    async def _activate_model(self, model_info: Dict[str, Any]):
+        """Make the model described by model_info current, loading it if not cached."""
+        version = str(model_info["version"])
+        # One loader per version; concurrent requests for it wait and reuse the result
+        async with self._load_locks.setdefault(version, asyncio.Lock()):
+            if version not in self._model_cache:
+                # Blocking file reads and compilation run off the event loop
+                model, (scaler, scaler_columns) = await asyncio.gather(
+                    self.mlflow_client.load_model(model_info["model_uri"]),
+                    asyncio.to_thread(self._load_scaler, model_info)
+                )
+                feature_order = self._resolve_feature_order(model, model_info)
+                if feature_order is None:
+                    raise ValueError(
+                        f"Feature order unknown for model version {version}; "
+                        "record 'features' in its model info"
+                    )
+                scaler_idx = None
+                if scaler is not None:
+                    missing = [c for c in scaler_columns if c not in feature_order]
+                    if missing:
+                        raise ValueError(f"Scaler columns {missing} are not model features")
+                    scaler_idx = np.asarray([feature_order.index(c) for c in scaler_columns], dtype=np.int64)
+                    # Compile (or load from numba's cache) the scaling kernel now
+                    # rather than on the first request
+                    await asyncio.to_thread(self._warm_up_scaling, scaler, scaler_idx, len(feature_order))
+                onnx_session = await asyncio.to_thread(self._compile_model, model)
+                self._model_cache[version] = (
+                    model, onnx_session, scaler, scaler_idx, feature_order, model_info
+                )
+                while len(self._model_cache) > self.cache_size:
+                    evicted, _ = self._model_cache.popitem(last=False)
+                    self._load_locks.pop(evicted, None)
+        
+        # Swap model and scaler together so requests never mix versions
+        self._model_cache.move_to_end(version)
+        (self.model, self.onnx_session, self.scaler, self.scaler_idx,
+         self.feature_order, self.model_metadata) = self._model_cache[version]
+        self.current_version = self.model_metadata["version"]
+        self.current_run_id = self.model_metadata["run_id"]
+    
+    def _warm_up_scaling(self, scaler, scaler_idx: np.ndarray, n_features: int):
+        """Run the scaling kernel once so JIT compilation happens at load time."""
+        if scaler.with_mean and scaler.with_std:
+            sample = np.zeros((1, n_features), dtype=np.float32)
+            scale_columns(sample, scaler_idx, scaler.mean_, scaler.scale_)
+    
+    def _resolve_feature_order(self, model, model_info: Dict[str, Any]) -> Optional[List[str]]:
+        """Feature column order the model was trained with, if known."""
+        if hasattr(model, "feature_names_in_"):
+            return list(model.feature_names_in_)
+        return model_info.get("features") or None
+    
+    def _load_scaler(self, model_info: Dict[str, Any]):
+        """Load the model's training-time scaler as (scaler, columns), if it had one."""
+        scaler_path = model_info.get("scaler_path")
+        if not scaler_path:
+            return None, None
+        
+        artifact = joblib.load(scaler_path)
+        logger.info(f"Loaded feature scaler from {scaler_path}")
+        return artifact["scaler"], artifact["columns"]
     
     async def load_production_model(self):
         """Load the current production model from MLflow."""
@@ -30,10 +131,7 @@ class ModelPredictor:
         if not model_info:
             raise ValueError("No production model found")
         
-        self.model = await self.mlflow_client.load_model(model_info["model_uri"])
-        self.current_version = model_info["version"]
-        self.current_run_id = model_info["run_id"]
-        self.model_metadata = model_info
+        await self._activate_model(model_info)
         
         logger.info(f"Loaded production model version {self.current_version}")
     
@@ -42,18 +140,68 @@ class ModelPredictor:
         if not self.mlflow_client:
             raise ValueError("MLflow client not initialized")
         
+        if str(version) in self._model_cache:
+            await self._activate_model(self._model_cache[str(version)][-1])
+            return
+        
         model_info = await self.mlflow_client.get_model_by_version(version)
         
         if not model_info:
             raise ValueError(f"Model version {version} not found")
         
-        self.model = await self.mlflow_client.load_model(model_info["model_uri"])
-        self.current_version = model_info["version"]
-        self.current_run_id = model_info["run_id"]
-        self.model_metadata = model_info
+        await self._activate_model(model_info)
         
         logger.info(f"Loaded model version {version}")
     
+    def _to_array(self, features) -> np.ndarray:
+        """Convert feature dicts or a DataFrame into a (rows, features) float32 array."""
+        order = self.feature_order
+        if isinstance(features, pd.DataFrame):
+            missing = [k for k in order if k not in features.columns]
+            if missing:
+                raise ValueError(f"Missing features: {missing}")
+            arr = features[order].to_numpy(dtype=np.float32, copy=True)
+        else:
+            rows = [features] if isinstance(features, dict) else features
+            arr = np.empty((len(rows), len(order)), dtype=np.float32)
+            try:
+                for i, row in enumerate(rows):
+                    arr[i] = np.fromiter((row[k] for k in order), dtype=np.float32, count=len(order))
+            except KeyError as e:
+                raise ValueError(f"Missing feature: {e.args[0]}") from None
+        
+        # Apply the training-time scaling to the numeric columns
+        if self.scaler is not None:
+            idx = self.scaler_idx
+            if self.scaler.with_mean and self.scaler.with_std:
+                scale_columns(arr, idx, self.scaler.mean_, self.scaler.scale_)
+            else:
+                arr[:, idx] = self.scaler.transform(arr[:, idx])
+        
+        return arr
+    
+    def _predict_array(self, arr: np.ndarray):
+        """Return predictions and per-row confidences for a feature array."""
+        if self.onnx_session is not None:
+            input_name = self.onnx_session.get_inputs()[0].name
+            proba_name = self.onnx_session.get_outputs()[1].name
+            proba = self.onnx_session.run([proba_name], {input_name: arr})[0]
+        else:
+            # Columns were already put in training order by name, so sklearn's
+            # "X does not have valid feature names" warning does not apply
+            with warnings.catch_warnings():
+                warnings.filterwarnings("ignore", message="X does not have valid feature names")
+                if not hasattr(self.model, 'predict_proba'):
+                    return self.model.predict(arr), None
+                proba = self.model.predict_proba(arr)
+        
+        # Derive the class from the probabilities to walk the model only once
+        pred_idx = np.argmax(proba, axis=1)
+        prediction = self.model.classes_[pred_idx]
+        confidence = proba[np.arange(len(pred_idx)), pred_idx]
+        
+        return prediction, confidence
+    
     async def predict(
         self,
         features: Dict[str, Any],
@@ -67,26 +215,42 @@ class ModelPredictor:
         if not self.model:
             raise ValueError("Model not loaded")
         
-        # Convert features to appropriate format
-        if isinstance(features, dict):
-            feature_df = pd.DataFrame([features])
-        else:
-            feature_df = features
+        prediction, confidence = self._predict_array(self._to_array(features))
+        
+        return {
+            "prediction": prediction.tolist() if isinstance(prediction, np.ndarray) else prediction,
+            "model_version": self.current_version,
+            "model_run_id": self.current_run_id,
+            "confidence": float(np.max(confidence)) if confidence is not None else None
+        }
+    
+    async def predict_batch(
+        self,
+        features: List[Dict[str, Any]],
+        model_version: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Make predictions for a batch of feature dicts in one model call."""
+        if model_version and model_version != self.current_version:
+            await self.load_model_version(model_version)
         
-        # Make prediction
-        prediction = self.model.predict(feature_df)
+        if not self.model:
+            raise ValueError("Model not loaded")
         
-        # Get prediction probability if available
-        confidence = None
-        if hasattr(self.model, 'predict_proba'):
-            proba = self.model.predict_proba(feature_df)
-            confidence = float(np.max(proba))
+        if len(features) == 0:
+            return {
+                "predictions": [],
+                "model_version": self.current_version,
+                "model_run_id": self.current_run_id,
+                "confidences": []
+            }
+        
+        prediction, confidence = self._predict_array(self._to_array(features))
         
         return {
-            "prediction": prediction.tolist() if isinstance(prediction, np.ndarray) else prediction,
+            "predictions": prediction.tolist(),
             "model_version": self.current_version,
             "model_run_id": self.current_run_id,
-            "confidence": confidence
+            "confidences": confidence.tolist() if confidence is not None else None
         }
     
     async def get_model_info(self) -> Dict[str, Any]:
@@ -112,6 +276,8 @@ def load_model(model_path):
 
 def make_predictions(model, input_data):
     """Legacy function for making predictions."""
+    if isinstance(model, RandomForestClassifier):
+        model.n_jobs = -1
     return model.predict(input_data)
 
 
@@ -1,18 +1,21 @@
 """Simple batch model training with local artifact saving."""
 import os
-import json
+import shutil
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
 import numpy as np
 import joblib
+import orjson
 import yaml
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score, precision_score, recall_score, 
-    f1_score, roc_auc_score, classification_report
-)
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import confusion_matrix, roc_auc_score
+from sklearn.preprocessing import StandardScaler
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -25,10 +28,97 @@ def load_config(config_path='config/model_config.yaml'):
         return yaml.safe_load(f)
 
 
-def load_data(file_path):
-    """Load data from CSV file."""
+def _read_csv_arrow(file_path):
+    """Read a CSV with PyArrow, matching ``pd.read_csv``'s missing values and types."""
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=8 << 20)
+    # Blank cells in string columns are NaN in pandas, not ''
+    convert_options = pa_csv.ConvertOptions(strings_can_be_null=True)
+    table = pa_csv.read_csv(file_path, read_options=read_options, convert_options=convert_options)
+    
+    # Arrow infers ISO dates/times where pandas keeps the text; re-read those as strings
+    temporal = [field.name for field in table.schema if pa.types.is_temporal(field.type)]
+    if temporal:
+        convert_options = pa_csv.ConvertOptions(
+            strings_can_be_null=True,
+            column_types={name: pa.string() for name in temporal}
+        )
+        table = pa_csv.read_csv(file_path, read_options=read_options, convert_options=convert_options)
+    
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def load_data(file_path, engine='pyarrow', use_cache=True):
+    """Load data from CSV file.
+
+    Uses PyArrow's multithreaded CSV reader when available and hands the
+    columnar buffers to pandas; falls back to ``pd.read_csv`` otherwise.
+    With ``use_cache`` a Parquet copy is kept next to the CSV and read
+    instead whenever it is newer than the CSV.
+    """
+    parquet_path = Path(file_path).with_suffix('.parquet')
+    if use_cache and pa_csv is not None and parquet_path.exists() \
+            and parquet_path.stat().st_mtime >= Path(file_path).stat().st_mtime:
+        logger.info(f"Loading cached data from {parquet_path}")
+        return pd.read_parquet(parquet_path, engine='pyarrow')
+
     logger.info(f"Loading data from {file_path}")
-    return pd.read_csv(file_path)
+    if engine == 'pyarrow' and pa_csv is not None:
+        df = _read_csv_arrow(file_path)
+    else:
+        df = pd.read_csv(file_path)
+
+    if use_cache and pa_csv is not None:
+        try:
+            df.to_parquet(parquet_path, engine='pyarrow', compression='zstd')
+        except OSError as e:
+            logger.warning(f"Could not cache data to {parquet_path}: {e}")
+    return df
+
+
+def build_model(params, model_type='random_forest'):
+    """Instantiate the estimator selected by ``model_type``.
+    
+    ``'hgbt'`` maps the forest-style params onto HistGradientBoostingClassifier,
+    which bins features to uint8 histograms internally.
+    """
+    if model_type == 'hgbt':
+        return HistGradientBoostingClassifier(
+            max_iter=params.get('n_estimators', 100),
+            max_depth=params.get('max_depth', 10),
+            random_state=params.get('random_state', 42),
+            early_stopping=True
+        )
+    if model_type == 'random_forest':
+        return RandomForestClassifier(**{'n_jobs': -1, **params})
+    raise ValueError(f"Unknown model_type: {model_type}")
+
+
+def compact_labels(y):
+    """Downcast integer labels to the smallest dtype holding them; leave others unchanged."""
+    if y.dtype.kind not in 'iu' or y.size == 0:
+        return y
+    dtype = np.result_type(np.min_scalar_type(y.min()), np.min_scalar_type(y.max()))
+    return y.astype(dtype, copy=False)
+
+
+def split_indices(n_rows, test_size=0.2, random_state=42, cache_path=None):
+    """Return reproducible (train, test) row indices.
+    
+    The permutation is cached in ``cache_path`` (if given) and reused while the
+    row count, test size and seed are unchanged.
+    """
+    split = int(n_rows * (1 - test_size))
+    if cache_path is not None and Path(cache_path).exists():
+        with np.load(cache_path) as cached:
+            if len(cached['idx']) == n_rows and int(cached['split']) == split \
+                    and int(cached['random_state']) == random_state:
+                idx = cached['idx']
+                return idx[:split], idx[split:]
+    
+    idx = np.random.default_rng(random_state).permutation(n_rows)
+    if cache_path is not None:
+        np.savez(cache_path, idx=idx, split=split, random_state=random_state)
+    return idx[:split], idx[split:]
 
 
 def train_model(X_train, y_train, config):
@@ -36,36 +126,67 @@ def train_model(X_train, y_train, config):
     params = config.get('model_params', {
         'n_estimators': 100,
         'max_depth': 10,
-        'random_state': 42
+        'random_state': 42,
+        'n_jobs': -1
     })
+    model_type = config.get('model_type', 'random_forest')
     
-    logger.info(f"Training model with params: {params}")
-    model = RandomForestClassifier(**params)
+    logger.info(f"Training {model_type} model with params: {params}")
+    model = build_model(params, model_type)
     model.fit(X_train, y_train)
     return model
 
 
+def classification_metrics(y_true, y_pred):
+    """Accuracy and support-weighted precision/recall/F1 from one confusion matrix.
+    
+    Equivalent to the sklearn scorers with ``average='weighted'`` and
+    ``zero_division=0``.
+    """
+    cm = confusion_matrix(y_true, y_pred)
+    tp = np.diag(cm)
+    support = cm.sum(axis=1)
+    pred_pos = cm.sum(axis=0)
+    
+    precision = tp / np.maximum(pred_pos, 1)
+    recall = tp / np.maximum(support, 1)
+    f1 = 2 * precision * recall / np.maximum(precision + recall, 1e-12)
+    weights = support / support.sum()
+    
+    return {
+        'accuracy': tp.sum() / cm.sum(),
+        'precision': (precision * weights).sum(),
+        'recall': (recall * weights).sum(),
+        'f1_score': (f1 * weights).sum()
+    }
+
+
 def evaluate_model(model, X_test, y_test):
     """Evaluate model and return metrics."""
     y_pred = model.predict(X_test)
     
-    metrics = {
-        'accuracy': float(accuracy_score(y_test, y_pred)),
-        'precision': float(precision_score(y_test, y_pred, average='weighted', zero_division=0)),
-        'recall': float(recall_score(y_test, y_pred, average='weighted', zero_division=0)),
-        'f1_score': float(f1_score(y_test, y_pred, average='weighted', zero_division=0))
-    }
+    metrics = classification_metrics(y_test, y_pred)
     
     # Add AUC if binary classification and predict_proba available
     if hasattr(model, 'predict_proba') and len(np.unique(y_test)) == 2:
         y_pred_proba = model.predict_proba(X_test)[:, 1]
-        metrics['roc_auc'] = float(roc_auc_score(y_test, y_pred_proba))
+        metrics['roc_auc'] = roc_auc_score(y_test, y_pred_proba)
     
     return metrics
 
 
-def save_model_and_metadata(model, metrics, config, model_dir='models/saved_models'):
-    """Save model artifact and metadata JSON."""
+def _link_latest(src_path, latest_path):
+    """Point latest_path at src_path via a hardlink, copying if unsupported."""
+    Path(latest_path).unlink(missing_ok=True)
+    try:
+        os.link(src_path, latest_path)
+    except OSError:
+        shutil.copyfile(src_path, latest_path)
+
+
+def save_model_and_metadata(model, metrics, config, model_dir='models/saved_models',
+                            scaler=None, scaler_columns=None, feature_names=None):
+    """Save model artifact, optional feature scaler and metadata JSON."""
     Path(model_dir).mkdir(parents=True, exist_ok=True)
     
     # Generate version
@@ -74,35 +195,45 @@ def save_model_and_metadata(model, metrics, config, model_dir='models/saved_mode
     
     # Save model
     model_path = os.path.join(model_dir, f'model_{version}.pkl')
-    joblib.dump(model, model_path)
+    # Uncompressed, protocol 5: fastest save/load; use compress=('lz4', 1) if size matters
+    joblib.dump(model, model_path, compress=0, protocol=5)
     logger.info(f"Model saved to {model_path}")
     
     # Save as 'latest' for easy loading
     latest_path = os.path.join(model_dir, 'model_latest.pkl')
-    joblib.dump(model, latest_path)
+    _link_latest(model_path, latest_path)
     logger.info(f"Model saved as latest: {latest_path}")
     
+    # Save the scaler the model was trained with, alongside its columns
+    scaler_path = None
+    if scaler is not None:
+        scaler_path = str(Path(model_dir, f'scaler_{version}.pkl').resolve())
+        joblib.dump({'scaler': scaler, 'columns': list(scaler_columns)}, scaler_path)
+        logger.info(f"Scaler saved to {scaler_path}")
+    
     # Save metadata
     metadata = {
         'version': version,
         'training_date': datetime.now().isoformat(),
-        'model_type': 'RandomForestClassifier',
+        'model_type': type(model).__name__,
         'metrics': metrics,
         'parameters': config.get('model_params', {}),
-        'features': config.get('features', []),
+        'features': list(feature_names) if feature_names is not None else config.get('features', []),
         'target': config.get('target', 'target'),
-        'model_path': model_path
+        'model_path': model_path,
+        'scaler_path': scaler_path
     }
     
     metadata_path = os.path.join(model_dir, f'metadata_{version}.json')
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    # orjson serializes numpy scalars directly, so metrics need no casting
+    Path(metadata_path).write_bytes(
+        orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+    )
     logger.info(f"Metadata saved to {metadata_path}")
     
     # Save as 'latest' metadata
     latest_metadata_path = os.path.join(model_dir, 'metadata_latest.json')
-    with open(latest_metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    _link_latest(metadata_path, latest_metadata_path)
     
     return version, model_path, metadata_path
 
@@ -141,12 +272,32 @@ def main():
     logger.info(f"Features: {list(X.columns)}")
     logger.info(f"Target: {target_column}")
     
-    # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42
+    # Split data by row index; fancy indexing yields C-contiguous float32
+    # arrays the tree builder uses without a further copy
+    train_idx, test_idx = split_indices(
+        len(X), test_size=0.2, random_state=42,
+        cache_path=Path(data_path).with_name('split_indices.npz')
     )
+    X_values = X.to_numpy(dtype=np.float32)
+    y_values = compact_labels(y.to_numpy())
+    X_train, X_test = X_values[train_idx], X_values[test_idx]
+    y_train, y_test = y_values[train_idx], y_values[test_idx]
+    del X_values
     logger.info(f"Train size: {len(X_train)}, Test size: {len(X_test)}")
     
+    # Standardize configured columns with statistics from the training split
+    scaled_columns = config.get('scaled_features') or []
+    scaler = None
+    if scaled_columns:
+        missing = [c for c in scaled_columns if c not in X.columns]
+        if missing:
+            logger.error(f"Scaled feature columns not found in data: {missing}")
+            return
+        idx = [X.columns.get_loc(c) for c in scaled_columns]
+        scaler = StandardScaler(copy=False).fit(X_train[:, idx])
+        X_train[:, idx] = scaler.transform(X_train[:, idx])
+        X_test[:, idx] = scaler.transform(X_test[:, idx])
+    
     # Train model
     model = train_model(X_train, y_train, config)
     
@@ -161,7 +312,8 @@ def main():
     
     # Save model and metadata
     version, model_path, metadata_path = save_model_and_metadata(
-        model, metrics, config
+        model, metrics, config, scaler=scaler, scaler_columns=scaled_columns,
+        feature_names=list(X.columns)
     )
     
     logger.info("\n" + "="*60)
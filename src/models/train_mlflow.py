@@ -7,9 +7,7 @@ import joblib
 import mlflow
 import mlflow.sklearn
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
-import pandas as pd
+from sklearn.metrics import roc_auc_score
 import numpy as np
 import yaml
 import logging
@@ -19,6 +17,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.utils.mlflow_utils import MLflowClient
 from src.data.data_access import DataAccess
+from src.models.train import load_data, build_model, classification_metrics
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,11 +52,14 @@ class ModelTrainer:
         """Train the model."""
         if params is None:
             params = self.config.get("model_params", {})
+        model_type = self.config.get("model_type", "random_forest")
+        if self.config.get("scaled_features"):
+            logger.warning("scaled_features is only supported by src/models/train.py; ignoring")
         
-        logger.info("Training model with parameters:")
+        logger.info(f"Training {model_type} model with parameters:")
         logger.info(params)
         
-        self.model = RandomForestClassifier(**params, random_state=42)
+        self.model = build_model({**params, "random_state": 42}, model_type)
         self.model.fit(X_train, y_train)
         
         logger.info("Model training completed")
@@ -71,12 +73,7 @@ class ModelTrainer:
         y_pred = self.model.predict(X_test)
         y_pred_proba = self.model.predict_proba(X_test)[:, 1] if hasattr(self.model, 'predict_proba') else None
         
-        self.metrics = {
-            "accuracy": accuracy_score(y_test, y_pred),
-            "precision": precision_score(y_test, y_pred, average='weighted'),
-            "recall": recall_score(y_test, y_pred, average='weighted'),
-            "f1_score": f1_score(y_test, y_pred, average='weighted')
-        }
+        self.metrics = classification_metrics(y_test, y_pred)
         
         if y_pred_proba is not None:
             self.metrics["roc_auc"] = roc_auc_score(y_test, y_pred_proba)
@@ -102,7 +99,7 @@ class ModelTrainer:
             
             # Save model
             model_path = Path(artifacts_dir) / "model.pkl"
-            joblib.dump(self.model, model_path)
+            joblib.dump(self.model, model_path, compress=0, protocol=5)
             artifacts["model"] = str(model_path)
         
         # Log to MLflow
@@ -163,8 +160,7 @@ async def train_pipeline(data_path: str = "data/processed/train.csv"):
     
     try:
         # Load data
-        logger.info(f"Loading data from {data_path}")
-        df = pd.read_csv(data_path)
+        df = load_data(data_path)
         
         # Prepare features and target
         # Adjust based on your actual data structure
@@ -1,25 +1,30 @@
-def load_data(file_path):
-    import pandas as pd
-    return pd.read_csv(file_path)
+import logging
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from src.models.train import load_data  # noqa: F401  (re-exported for existing callers)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 def save_data(df, file_path):
     df.to_csv(file_path, index=False)
 
 def log_message(message):
-    import logging
-    logging.basicConfig(level=logging.INFO)
-    logging.info(message)
+    logger.info(message)
 
 def check_missing_values(df):
     return df.isnull().sum()
 
 def encode_categorical(df, columns):
     for column in columns:
-        df[column] = df[column].astype('category').cat.codes
+        codes, uniques = pd.factorize(df[column], sort=True)
+        df[column] = codes.astype(np.int16 if len(uniques) < 2**15 else np.int32, copy=False)
     return df
 
 def split_data(df, target_column, test_size=0.2, random_state=42):
-    from sklearn.model_selection import train_test_split
     X = df.drop(columns=[target_column])
     y = df[target_column]
     return train_test_split(X, y, test_size=test_size, random_state=random_state)
\ No newline at end of file
@@ -7,6 +7,38 @@ import pytest
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+def model_info(version, **extra):
+    """Model info dict as returned by the MLflow client."""
+    return {"model_uri": f"models:/{version}", "version": version, "run_id": f"run-{version}", **extra}
+
+
+class FakeMLflowClient:
+    """Async stand-in for the MLflow client serving fixed models.
+
+    ``info`` is reported as the production model; ``others`` adds further
+    ``(model, info)`` versions.
+    """
+
+    def __init__(self, model, info, others=()):
+        self.production_info = info
+        self.infos = {}
+        self.models = {}
+        self.loaded = []
+        for m, info in [(model, info), *others]:
+            self.infos[str(info["version"])] = info
+            self.models[info["model_uri"]] = m
+
+    async def get_latest_production_model(self):
+        return self.production_info
+
+    async def get_model_by_version(self, version):
+        return self.infos.get(str(version))
+
+    async def load_model(self, model_uri):
+        self.loaded.append(model_uri)
+        return self.models[model_uri]
+
+
 def test_imports():
     """Test that core modules can be imported."""
     from src.models import train
@@ -37,3 +69,341 @@ def test_config_loading():
     config = load_config()
     assert isinstance(config, dict)
     assert 'model_params' in config or 'target' in config
+
+
+def test_load_data_engines_match(tmp_path):
+    """Test that the PyArrow and pandas CSV readers agree."""
+    import pandas as pd
+    from src.models.train import load_data
+    csv_path = tmp_path / "train.csv"
+    pd.DataFrame({
+        'feature1': [0.5, 1.5],
+        'category': ['a', None],
+        'event_date': ['2024-01-02', '2024-03-04'],
+        'event_time': ['2024-01-02 10:00:00', '2024-03-04T11:30:00'],
+        'target': [0, 1]
+    }).to_csv(csv_path, index=False)
+    pd.testing.assert_frame_equal(
+        load_data(csv_path, engine='pyarrow', use_cache=False),
+        load_data(csv_path, engine='pandas', use_cache=False)
+    )
+
+
+def test_load_data_parquet_cache(tmp_path):
+    """Test that a Parquet sidecar is written and reused."""
+    import pandas as pd
+    from src.models.train import load_data
+    csv_path = tmp_path / "train.csv"
+    df = pd.DataFrame({'feature1': [0.5, 1.5], 'target': [0, 1]})
+    df.to_csv(csv_path, index=False)
+    first = load_data(csv_path)
+    assert (tmp_path / "train.parquet").exists()
+    pd.testing.assert_frame_equal(load_data(csv_path), first)
+
+
+def test_save_model_and_metadata_links_latest(tmp_path):
+    """Test that the 'latest' artifacts mirror the versioned ones."""
+    import json
+    import joblib
+    from sklearn.dummy import DummyClassifier
+    from src.models.train import save_model_and_metadata
+    model = DummyClassifier().fit([[0], [1]], [0, 1])
+    version, model_path, metadata_path = save_model_and_metadata(
+        model, {'accuracy': 0.5}, {}, model_dir=str(tmp_path)
+    )
+    assert isinstance(joblib.load(tmp_path / 'model_latest.pkl'), DummyClassifier)
+    with open(tmp_path / 'metadata_latest.json') as f:
+        assert json.load(f)['version'] == version
+
+
+def test_predictor_single_and_batch_agree():
+    """Test that predict and predict_batch return consistent results."""
+    import asyncio
+    from sklearn.ensemble import RandomForestClassifier
+    from src.models.predict import ModelPredictor
+
+    model = RandomForestClassifier(n_estimators=5, random_state=42)
+    model.fit([[0.0, 0.0], [1.0, 1.0], [0.0, 1.0], [1.0, 0.0]], [0, 1, 0, 1])
+
+    client = FakeMLflowClient(model, model_info("1", features=["feature1", "feature2"]))
+    predictor = ModelPredictor(client)
+    rows = [{"feature2": 1.0, "feature1": 1.0}, {"feature1": 0.0, "feature2": 0.0}]
+
+    async def run():
+        await predictor.load_production_model()
+        single = [await predictor.predict(row) for row in rows]
+        batch = await predictor.predict_batch(rows)
+        return single, batch
+
+    single, batch = asyncio.run(run())
+    assert batch["predictions"] == [s["prediction"][0] for s in single]
+    assert batch["confidences"] == [s["confidence"] for s in single]
+
+
+def test_predictor_caches_model_versions():
+    """Test that switching back to a loaded version does not reload it."""
+    import asyncio
+    from sklearn.dummy import DummyClassifier
+    from src.models.predict import ModelPredictor
+
+    model = DummyClassifier().fit([[0.0], [1.0]], [0, 1])
+    client = FakeMLflowClient(
+        model, model_info("1", features=["feature1"]),
+        others=[(model, model_info("2", features=["feature1"]))]
+    )
+    predictor = ModelPredictor(client)
+
+    async def run():
+        for version in ["1", "2", "1"]:
+            await predictor.load_model_version(version)
+
+    asyncio.run(run())
+    assert client.loaded == ["models:/1", "models:/2"]
+    assert predictor.current_version == "1"
+
+
+def test_classification_metrics_match_sklearn():
+    """Test that the fused metrics agree with the individual sklearn scorers."""
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
+    from src.models.train import classification_metrics
+    y_true = [0, 1, 2, 2, 1, 0, 2, 1]
+    y_pred = [0, 2, 2, 2, 0, 0, 1, 1]
+    metrics = classification_metrics(y_true, y_pred)
+    kwargs = {'average': 'weighted', 'zero_division': 0}
+    assert metrics['accuracy'] == pytest.approx(accuracy_score(y_true, y_pred))
+    assert metrics['precision'] == pytest.approx(precision_score(y_true, y_pred, **kwargs))
+    assert metrics['recall'] == pytest.approx(recall_score(y_true, y_pred, **kwargs))
+    assert metrics['f1_score'] == pytest.approx(f1_score(y_true, y_pred, **kwargs))
+
+
+def test_split_indices_cached(tmp_path):
+    """Test that split indices partition the rows and are reused from cache."""
+    import numpy as np
+    from src.models.train import split_indices
+    cache_path = tmp_path / "split_indices.npz"
+    train_idx, test_idx = split_indices(10, cache_path=cache_path)
+    assert len(train_idx) == 8 and len(test_idx) == 2
+    assert sorted(np.concatenate([train_idx, test_idx])) == list(range(10))
+    assert cache_path.exists()
+    cached_train, cached_test = split_indices(10, cache_path=cache_path)
+    assert np.array_equal(cached_train, train_idx) and np.array_equal(cached_test, test_idx)
+
+
+def test_helpers_load_data_is_train_load_data():
+    """Test that the helpers module reuses the training data loader."""
+    from src.models.train import load_data
+    from src.utils import helpers
+    assert helpers.load_data is load_data
+
+
+def test_compact_labels_preserves_values():
+    """Test that label downcasting never changes label values."""
+    import numpy as np
+    from src.models.train import compact_labels
+    assert compact_labels(np.array([0, 1, 1])).dtype == np.uint8
+    assert compact_labels(np.array([-1, 200])).tolist() == [-1, 200]
+    assert compact_labels(np.array([0, 70000])).tolist() == [0, 70000]
+    labels = np.array(['yes', 'no'], dtype=object)
+    assert compact_labels(labels) is labels
+
+
+def test_onnx_predictions_match_sklearn(monkeypatch):
+    """Test that ONNX Runtime serving agrees with the sklearn model."""
+    pytest.importorskip("skl2onnx")
+    pytest.importorskip("onnxruntime")
+    import asyncio
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from src.models.predict import ModelPredictor
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 3)).astype(np.float32)
+    y = (X[:, 0] + X[:, 1] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=10, random_state=42).fit(X, y)
+
+    monkeypatch.setenv("USE_ONNX_RUNTIME", "1")
+    client = FakeMLflowClient(model, model_info("1", features=["feature1", "feature2", "feature3"]))
+    predictor = ModelPredictor(client)
+    asyncio.run(predictor.load_production_model())
+    assert predictor.onnx_session is not None
+
+    prediction, confidence = predictor._predict_array(X)
+    np.testing.assert_array_equal(prediction, model.predict(X))
+    np.testing.assert_allclose(confidence, model.predict_proba(X).max(axis=1), atol=1e-5)
+
+
+def test_chunked_scaling_matches_full_fit():
+    """Test that fitting on all chunks before transforming matches a single fit."""
+    import numpy as np
+    import pandas as pd
+    from src.features.engineering import fit_scaler, scale_features
+    df = pd.DataFrame({'num': np.arange(10, dtype=np.float64) ** 2})
+    chunks = [df.iloc[:4].copy(), df.iloc[4:].copy()]
+    scaler = None
+    for chunk in chunks:
+        scaler = fit_scaler(chunk, ['num'], scaler)
+    scaled = pd.concat([scale_features(chunk, ['num'], scaler) for chunk in chunks])
+    expected = scale_features(df.copy(), ['num'])
+    np.testing.assert_allclose(scaled['num'], expected['num'], rtol=1e-5)
+
+
+def test_predictor_applies_model_scaler(tmp_path):
+    """Test that a model's saved scaler is applied only to that model."""
+    import asyncio
+    import json
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    from src.models.predict import ModelPredictor
+    from src.models.train import save_model_and_metadata
+
+    rng = np.random.default_rng(0)
+    X = (rng.standard_normal((200, 2)) * [1.0, 50.0] + [0.0, 100.0]).astype(np.float32)
+    y = (X[:, 1] > 100).astype(int)
+    scaler = StandardScaler().fit(X[:, [1]])
+    X_scaled = X.copy()
+    X_scaled[:, [1]] = scaler.transform(X[:, [1]])
+    model = RandomForestClassifier(n_estimators=10, random_state=42).fit(X_scaled, y)
+
+    config = {'features': ['feature1', 'feature2']}
+    version, _, metadata_path = save_model_and_metadata(
+        model, {}, config, model_dir=str(tmp_path),
+        scaler=scaler, scaler_columns=['feature2']
+    )
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    assert Path(metadata['scaler_path']).is_absolute()
+
+    plain_model = RandomForestClassifier(n_estimators=10, random_state=42).fit(X, y)
+    client = FakeMLflowClient(
+        model, {**metadata, **model_info(version)},
+        others=[(plain_model, model_info("unscaled", features=['feature1', 'feature2']))]
+    )
+    predictor = ModelPredictor(client)
+    rows = [{'feature1': float(a), 'feature2': float(b)} for a, b in X[:20]]
+
+    async def run():
+        await predictor.load_model_version(version)
+        scaled = await predictor.predict_batch(rows)
+        await predictor.load_model_version("unscaled")
+        assert predictor.scaler is None
+        return scaled
+
+    result = asyncio.run(run())
+    assert result["predictions"] == model.predict(X_scaled[:20]).tolist()
+
+
+def test_predictor_input_validation(monkeypatch):
+    """Test feature-order, missing-key and empty-batch handling."""
+    import asyncio
+    import warnings
+    import pandas as pd
+    from sklearn.ensemble import RandomForestClassifier
+    from src.models.predict import ModelPredictor
+
+    X = pd.DataFrame({"feature1": [0.0, 1.0, 0.0, 1.0], "feature2": [0.0, 1.0, 1.0, 0.0]})
+    named_model = RandomForestClassifier(n_estimators=5, random_state=42).fit(X, [0, 1, 0, 1])
+    unnamed_model = RandomForestClassifier(n_estimators=5).fit(X.to_numpy(), [0, 1, 0, 1])
+    client = FakeMLflowClient(named_model, model_info("named"),
+                              others=[(unnamed_model, model_info("unnamed"))])
+
+    monkeypatch.setenv("USE_ONNX_RUNTIME", "0")
+    predictor = ModelPredictor(client)
+
+    async def run():
+        with pytest.raises(ValueError, match="Feature order unknown"):
+            await predictor.load_model_version("unnamed")
+
+        await predictor.load_model_version("named")
+        with pytest.raises(ValueError, match="feature2"):
+            await predictor.predict({"feature1": 1.0})
+        assert (await predictor.predict_batch([]))["predictions"] == []
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            result = await predictor.predict({"feature2": 1.0, "feature1": 1.0})
+        assert result["prediction"] == named_model.predict(X.iloc[[1]]).tolist()
+
+    asyncio.run(run())
+
+
+def test_scale_columns_matches_standard_scaler():
+    """Test that the compiled scaling kernel matches StandardScaler.transform."""
+    import numpy as np
+    from sklearn.preprocessing import StandardScaler
+    from src.features.engineering import scale_columns
+    rng = np.random.default_rng(0)
+    X = (rng.standard_normal((50, 4)) * [1.0, 10.0, 0.1, 5.0] + 3.0).astype(np.float32)
+    cols = np.array([1, 3], dtype=np.int64)
+    scaler = StandardScaler().fit(X[:, cols])
+    expected = X.copy()
+    expected[:, cols] = scaler.transform(X[:, cols])
+    scale_columns(X, cols, scaler.mean_, scaler.scale_)
+    np.testing.assert_allclose(X, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_create_features_matches_product():
+    """Test the engineered feature for both the compiled and numpy kernels."""
+    import numpy as np
+    import pandas as pd
+    from src.features import engineering
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'feature1': rng.standard_normal(1000), 'feature2': rng.standard_normal(1000)})
+    expected = df['feature1'].to_numpy(np.float32) * df['feature2'].to_numpy(np.float32)
+
+    result = engineering.create_features(df.copy())
+    np.testing.assert_allclose(result['new_feature'], expected, rtol=1e-6)
+
+    out = np.empty(len(df), dtype=np.float32)
+    engineering._fuse_numpy(df['feature1'].to_numpy(np.float32), df['feature2'].to_numpy(np.float32), out)
+    np.testing.assert_array_equal(out, expected)
+
+
+def test_categorical_codes_independent_of_row_order():
+    """Test that separately encoded frames map categories to the same codes."""
+    import pandas as pd
+    from src.features.engineering import encode_categorical_features
+    from src.utils.helpers import encode_categorical
+    for encode in (encode_categorical_features, encode_categorical):
+        first = encode(pd.DataFrame({'c': ['b', 'a', 'b']}), ['c'])
+        second = encode(pd.DataFrame({'c': ['a', 'b']}), ['c'])
+        assert first['c'].tolist() == [1, 0, 1]
+        assert second['c'].tolist() == [0, 1]
+
+
+def test_predictor_concurrent_loads_and_minimum_cache(monkeypatch):
+    """Test that concurrent loads share one download and a zero cache size still works."""
+    import asyncio
+    from sklearn.dummy import DummyClassifier
+    from src.models import predict
+
+    monkeypatch.setattr(predict, "MODEL_CACHE_SIZE", 0)
+    model = DummyClassifier().fit([[0.0], [1.0]], [0, 1])
+    client = FakeMLflowClient(model, model_info("1", features=["feature1"]))
+    predictor = predict.ModelPredictor(client)
+
+    async def run():
+        await asyncio.gather(predictor.load_model_version("1"), predictor.load_model_version("1"))
+        await predictor.load_production_model()
+
+    asyncio.run(run())
+    assert client.loaded == ["models:/1"]
+    assert predictor.current_version == "1"
+
+
+def test_build_model_types():
+    """Test estimator selection and parameter mapping in build_model."""
+    from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+    from src.models.train import build_model
+    params = {'n_estimators': 50, 'max_depth': 4, 'random_state': 7}
+
+    hgbt = build_model(params, 'hgbt')
+    assert isinstance(hgbt, HistGradientBoostingClassifier)
+    assert (hgbt.max_iter, hgbt.max_depth, hgbt.random_state) == (50, 4, 7)
+
+    forest = build_model(params)
+    assert isinstance(forest, RandomForestClassifier)
+    assert forest.n_jobs == -1
+
+    with pytest.raises(ValueError, match="Unknown model_type"):
+        build_model(params, 'xgboost')